@@ -0,0 +1,53 @@
+"""Add admin flag and per-job profiling columns
+
+Tables predate alembic and were created by Base.metadata.create_all, so this
+revision only adds columns that are missing; it is safe on databases that
+create_all already brought up to date.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = {
+    "users": [
+        sa.Column("is_admin", sa.Boolean(), nullable=True, server_default=sa.false()),
+    ],
+    "jobs": [
+        sa.Column("profile_enabled", sa.Boolean(), nullable=True, server_default=sa.false()),
+        sa.Column("profile_path", sa.String(), nullable=True),
+        sa.Column("memory_snapshot_path", sa.String(), nullable=True),
+        sa.Column("profile_summary", sa.Text(), nullable=True),
+    ],
+}
+
+def _existing_columns(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column["name"] for column in inspector.get_columns(table)}
+
+def upgrade():
+    for table, columns in NEW_COLUMNS.items():
+        existing = _existing_columns(table)
+        if existing is None:
+            # Fresh database: create_all at startup creates the full table
+            continue
+        for column in columns:
+            if column.name not in existing:
+                op.add_column(table, column)
+
+def downgrade():
+    for table, columns in NEW_COLUMNS.items():
+        existing = _existing_columns(table) or set()
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                if column.name in existing:
+                    batch_op.drop_column(column.name)
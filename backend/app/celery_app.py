@@ -1,6 +1,10 @@
 from celery import Celery
+from celery.signals import before_task_publish, task_prerun, task_postrun, worker_init, worker_process_init
+from celery.utils.log import current_process_index
 import os
+import time
 from dotenv import load_dotenv
+from app.metrics import TASK_QUEUE_WAIT_SECONDS, TASK_SECONDS, start_http_server
 
 load_dotenv()
 
@@ -8,8 +12,8 @@ redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
 
 celery_app = Celery(
     "watermark_remover",
-    broker=redis_url,
-    backend=redis_url,
+    broker=os.getenv("CELERY_BROKER_URL", redis_url),
+    backend=os.getenv("CELERY_RESULT_BACKEND", redis_url),
     include=["app.tasks"]
 )
 
@@ -20,3 +24,39 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
 )
+
+# Metrics: queue wait is measured from publish time carried in a message header
+_task_started_at = {}
+
+@before_task_publish.connect
+def _stamp_publish_time(headers=None, **kwargs):
+    if headers is not None:
+        headers["published_at"] = time.time()
+
+@task_prerun.connect
+def _record_task_start(task_id=None, task=None, **kwargs):
+    published_at = getattr(task.request, "published_at", None)
+    if published_at:
+        TASK_QUEUE_WAIT_SECONDS.observe(max(0.0, time.time() - published_at), task=task.name)
+    _task_started_at[task_id] = time.perf_counter()
+
+@task_postrun.connect
+def _record_task_end(task_id=None, task=None, state=None, **kwargs):
+    started_at = _task_started_at.pop(task_id, None)
+    if started_at is not None:
+        TASK_SECONDS.observe(time.perf_counter() - started_at, task=task.name, state=state or "UNKNOWN")
+
+# Metrics are per process. The worker's main process (which runs tasks under the
+# solo/threads pools) serves WORKER_METRICS_PORT; prefork child N serves
+# WORKER_METRICS_PORT + N, so scrape ports PORT..PORT+concurrency.
+@worker_init.connect
+def _start_worker_metrics_server(**kwargs):
+    port = os.getenv("WORKER_METRICS_PORT")
+    if port:
+        start_http_server(int(port))
+
+@worker_process_init.connect
+def _start_child_metrics_server(**kwargs):
+    port = os.getenv("WORKER_METRICS_PORT")
+    if port:
+        start_http_server(int(port) + (current_process_index(base=1) or 0))
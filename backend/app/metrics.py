@@ -0,0 +1,260 @@
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+Metrics are kept per process: the API serves its own at /api/metrics (when
+METRICS_TOKEN is set) and Celery worker processes serve theirs on ports from
+WORKER_METRICS_PORT upwards (see app/celery_app.py). The worker ports are
+unauthenticated and must stay on the internal network.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+FRAME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames) or not all(name in labels for name in self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+class _Timer:
+    """Context manager observing elapsed wall time into a histogram"""
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: "Histogram", labels: Dict[str, str]):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._histogram.observe(time.perf_counter() - self._start, **self._labels)
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, **labels) -> _Timer:
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Global registry
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "API request latency by route",
+    ("method", "route", "status"),
+)
+TASK_QUEUE_WAIT_SECONDS = registry.histogram(
+    "celery_task_queue_wait_seconds", "Time between task publish and worker start",
+    ("task",),
+)
+TASK_SECONDS = registry.histogram(
+    "celery_task_duration_seconds", "Celery task run time",
+    ("task", "state"),
+)
+STAGE_SECONDS = registry.histogram(
+    "processing_stage_duration_seconds",
+    "Time spent per processing stage (process, detect, inpaint, decode, encode, download, upload)",
+    ("stage",), buckets=FRAME_BUCKETS + DEFAULT_BUCKETS[8:],
+)
+FRAMES_PROCESSED = registry.counter(
+    "frames_processed_total", "Video frames processed; rate() gives frames/sec",
+)
+STORAGE_BYTES = registry.counter(
+    "storage_bytes_transferred_total", "Bytes moved to or from object storage",
+    ("direction",),
+)
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss)",
+    ("cache", "result"),
+)
+
+# Observers (e.g. an active JobProfiler) notified around every stage. Context-local,
+# so a profiled job only sees its own stages under the threads/gevent pools.
+_stage_observers: ContextVar[Tuple[object, ...]] = ContextVar("stage_observers", default=())
+
+def add_stage_observer(observer) -> None:
+    _stage_observers.set(_stage_observers.get() + (observer,))
+
+def remove_stage_observer(observer) -> None:
+    _stage_observers.set(tuple(o for o in _stage_observers.get() if o is not observer))
+
+class _ObservedStageTimer(_Timer):
+    """Stage timer that also notifies stage observers"""
+    __slots__ = ("_stage", "_observers", "_tokens")
+
+    def __init__(self, stage: str, observers: Tuple[object, ...]):
+        super().__init__(STAGE_SECONDS, {"stage": stage})
+        self._stage = stage
+        self._observers = observers
+
+    def __enter__(self) -> "_ObservedStageTimer":
+        self._tokens = [(observer, observer.stage_started(self._stage)) for observer in self._observers]
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        super().__exit__(exc_type, exc, tb)
+        for observer, token in reversed(self._tokens):
+            observer.stage_finished(self._stage, token)
+
+def time_stage(stage: str) -> _Timer:
+    """Time a processing stage, e.g. ``with time_stage("detect"): ...``"""
+    observers = _stage_observers.get()
+    if observers:
+        return _ObservedStageTimer(stage, observers)
+    return STAGE_SECONDS.time(stage=stage)
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+def render_latest() -> str:
+    return registry.render()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render_latest().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE_LATEST)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_http_server(port: int, addr: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """Serve this process's metrics on a background thread"""
+    try:
+        server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning(f"Metrics server not started on port {port}: {str(e)}")
+        return None
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    logger.info(f"Metrics server listening on {addr}:{port}")
+    return server
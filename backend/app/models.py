@@ -24,6 +24,7 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
+    is_admin = Column(Boolean, default=False)
     subscription_tier = Column(Enum(SubscriptionTier), default=SubscriptionTier.FREE)
     subscription_expires_at = Column(DateTime, nullable=True)
     stripe_customer_id = Column(String, nullable=True)
@@ -43,6 +44,10 @@ class Job(Base):
     processed_file_path = Column(String, nullable=True)
     status = Column(Enum(JobStatus), default=JobStatus.PENDING)
     error_message = Column(Text, nullable=True)
+    profile_enabled = Column(Boolean, default=False)
+    profile_path = Column(String, nullable=True)
+    memory_snapshot_path = Column(String, nullable=True)
+    profile_summary = Column(Text, nullable=True)
     processing_started_at = Column(DateTime, nullable=True)
     processing_completed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
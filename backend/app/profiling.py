@@ -0,0 +1,135 @@
+"""Opt-in CPU and memory profiling for a single processing job.
+
+A JobProfiler runs cProfile and tracemalloc while active and registers itself
+as a stage observer for its own context, so every ``time_stage`` block the job
+runs also gets its allocations sampled. Stages may nest.
+
+tracemalloc is process-wide: under the threads/gevent pools, memory figures
+also include allocations made by jobs running concurrently.
+"""
+import cProfile
+import os
+import pstats
+import threading
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+from app import metrics
+
+TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "10"))
+
+# tracemalloc has a single global peak. Whenever any profiler reads it, the
+# peak is folded into every open stage of every active profiler before being
+# reset, so concurrent and nested stages never lose each other's peaks.
+_lock = threading.Lock()
+_active_profilers: List["JobProfiler"] = []
+_owns_tracemalloc = False
+
+def _fold_peak() -> int:
+    """Record the peak since the last reset with all active profilers; caller holds _lock"""
+    current, peak = tracemalloc.get_traced_memory()
+    for profiler in _active_profilers:
+        profiler._observe_peak(peak)
+    tracemalloc.reset_peak()
+    return current
+
+class JobProfiler:
+    """Context manager capturing a cProfile profile and a tracemalloc snapshot"""
+
+    def __init__(self, top_n: int = 20):
+        self.top_n = top_n
+        self.profile = cProfile.Profile()
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.peak_memory_bytes = 0
+        self.stages: Dict[str, Dict[str, int]] = {}
+        # Open stages, innermost last: [bytes at start, peak bytes seen so far]
+        self._open_stages: List[List[int]] = []
+
+    def __enter__(self) -> "JobProfiler":
+        global _owns_tracemalloc
+        with _lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                _owns_tracemalloc = True
+            elif _active_profilers:
+                _fold_peak()
+            else:
+                tracemalloc.reset_peak()
+            _active_profilers.append(self)
+        metrics.add_stage_observer(self)
+        self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        global _owns_tracemalloc
+        self.profile.disable()
+        metrics.remove_stage_observer(self)
+        with _lock:
+            _fold_peak()
+            _active_profilers.remove(self)
+            self.snapshot = tracemalloc.take_snapshot()
+            if _owns_tracemalloc and not _active_profilers:
+                tracemalloc.stop()
+                _owns_tracemalloc = False
+
+    def _observe_peak(self, peak: int) -> None:
+        self.peak_memory_bytes = max(self.peak_memory_bytes, peak)
+        for open_stage in self._open_stages:
+            open_stage[1] = max(open_stage[1], peak)
+
+    # Stage observer interface used by metrics.time_stage
+    def stage_started(self, stage: str) -> List[int]:
+        with _lock:
+            current = _fold_peak()
+            open_stage = [current, current]
+            self._open_stages.append(open_stage)
+        return open_stage
+
+    def stage_finished(self, stage: str, open_stage: List[int]) -> None:
+        with _lock:
+            current = _fold_peak()
+            self._open_stages.remove(open_stage)
+        started_bytes, peak = open_stage
+        stats = self.stages.setdefault(stage, {"calls": 0, "net_bytes": 0, "max_peak_bytes": 0})
+        stats["calls"] += 1
+        stats["net_bytes"] += current - started_bytes
+        stats["max_peak_bytes"] = max(stats["max_peak_bytes"], peak - started_bytes)
+
+    def save(self, directory: str) -> Tuple[str, str]:
+        """Write the profile (pstats format) and memory snapshot to a directory"""
+        profile_path = os.path.join(directory, "profile.prof")
+        snapshot_path = os.path.join(directory, "memory.snapshot")
+        self.profile.dump_stats(profile_path)
+        if self.snapshot is not None:
+            self.snapshot.dump(snapshot_path)
+        return profile_path, snapshot_path
+
+    def summary(self) -> dict:
+        """Top functions by self time, top allocation sites and per-stage memory"""
+        stats = pstats.Stats(self.profile)
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+        top_functions: List[dict] = [
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "total_time": round(total_time, 6),
+                "cumulative_time": round(cumulative_time, 6),
+            }
+            for (filename, line, name), (_, calls, total_time, cumulative_time, _) in functions[:self.top_n]
+        ]
+        top_allocations: List[dict] = []
+        if self.snapshot is not None:
+            for stat in self.snapshot.statistics("lineno")[:self.top_n]:
+                frame = stat.traceback[0]
+                top_allocations.append({
+                    "site": f"{frame.filename}:{frame.lineno}",
+                    "size_bytes": stat.size,
+                    "count": stat.count,
+                })
+        return {
+            "total_time": round(stats.total_tt, 6),
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "stages": self.stages,
+            "top_functions": top_functions,
+            "top_allocations": top_allocations,
+        }
@@ -17,6 +17,7 @@ class UserLogin(BaseModel):
 class User(UserBase):
     id: int
     is_active: bool
+    is_admin: bool = False
     subscription_tier: SubscriptionTier
     subscription_expires_at: Optional[datetime]
     created_at: datetime
@@ -42,6 +43,10 @@ class Job(JobBase):
     processed_file_path: Optional[str]
     status: JobStatus
     error_message: Optional[str]
+    profile_enabled: bool = False
+    profile_path: Optional[str] = None
+    memory_snapshot_path: Optional[str] = None
+    profile_summary: Optional[str] = None
     processing_started_at: Optional[datetime]
     processing_completed_at: Optional[datetime]
     created_at: datetime
@@ -56,6 +61,10 @@ class JobStatusResponse(BaseModel):
     progress: Optional[float] = None
     error_message: Optional[str] = None
 
+class BulkJobStatusResponse(BaseModel):
+    jobs: List[JobStatusResponse]
+    missing_job_ids: List[int] = []
+
 # Subscription schemas
 class SubscriptionCreate(BaseModel):
     price_id: str  # Stripe price ID
@@ -4,8 +4,14 @@ from sqlalchemy import func
 from app.celery_app import celery_app
 from app.database import SessionLocal
 from app.models import Job, JobStatus
+from app.metrics import time_stage
+from app.profiling import JobProfiler
 from services.watermark_remover import watermark_remover
+from services.gcs_service import gcs_service
+from contextlib import nullcontext
 import os
+import json
+import tempfile
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,6 +23,20 @@ def get_db():
     finally:
         db.close()
 
+def _store_profile_artifacts(job: Job, profiler: JobProfiler):
+    """Upload profile and memory snapshot and link them to the job"""
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            profile_file, snapshot_file = profiler.save(temp_dir)
+            prefix = f"profiles/{job.user_id}/{job.id}"
+            if gcs_service.upload_file(profile_file, f"{prefix}/profile.prof"):
+                job.profile_path = f"{prefix}/profile.prof"
+            if os.path.exists(snapshot_file) and gcs_service.upload_file(snapshot_file, f"{prefix}/memory.snapshot"):
+                job.memory_snapshot_path = f"{prefix}/memory.snapshot"
+        job.profile_summary = json.dumps(profiler.summary())
+    except Exception as e:
+        logger.error(f"Error storing profile for job {job.id}: {str(e)}")
+
 @celery_app.task(bind=True)
 def process_video(self, job_id: int):
     """Process video to remove watermarks"""
@@ -33,10 +53,11 @@ def process_video(self, job_id: int):
         job.processing_started_at = db.query(func.now()).scalar()
         db.commit()
         
-        # Process video
-        input_path = job.original_file_path
-        output_filename = f"processed_{job.original_filename}"
-        output_path = os.path.join(os.path.dirname(input_path), output_filename)
+        # Process video; file paths on the job are storage keys
+        input_key = job.original_file_path
+        # Output is always H.264/AAC in MP4, whatever container was uploaded
+        output_filename = f"processed_{os.path.splitext(os.path.basename(job.original_filename))[0]}.mp4"
+        output_key = os.path.join(os.path.dirname(input_key), output_filename)
         
         # Update progress
         current_task.update_state(
@@ -44,13 +65,28 @@ def process_video(self, job_id: int):
             meta={"current": 0, "total": 100, "status": "Starting watermark removal..."}
         )
         
-        # Remove watermarks
-        success = watermark_remover.remove_watermark_from_video(input_path, output_path)
+        # Remove watermarks, under cProfile/tracemalloc when requested
+        profiler = JobProfiler() if job.profile_enabled else None
+        try:
+            with profiler or nullcontext(), tempfile.TemporaryDirectory() as work_dir:
+                input_path = os.path.join(work_dir, os.path.basename(input_key))
+                output_path = os.path.join(work_dir, output_filename)
+                if not gcs_service.download_file(input_key, input_path):
+                    raise RuntimeError("Failed to download input video")
+                
+                with time_stage("process"):
+                    success = watermark_remover.remove_watermark_from_video(input_path, output_path)
+                
+                if success and not gcs_service.upload_file(output_path, output_key):
+                    raise RuntimeError("Failed to upload processed video")
+        finally:
+            if profiler:
+                _store_profile_artifacts(job, profiler)
         
         if success:
             # Update job with success
             job.status = JobStatus.COMPLETED
-            job.processed_file_path = output_path
+            job.processed_file_path = output_key
             job.processing_completed_at = db.query(func.now()).scalar()
             db.commit()
             
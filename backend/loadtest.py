@@ -0,0 +1,430 @@
+"""Local end-to-end load test for the upload -> process -> download flow.
+
+Starts the API (uvicorn), a prefork Celery worker and a static file server
+for storage as separate processes sharing local stand-ins (SQLite for the
+database and broker, filesystem storage by default), then drives concurrent
+users from this process through register, login, upload, status polling and
+download with synthetic videos (ffmpeg and ffprobe must be on PATH). Results
+are written as JSON so runs can be compared against a saved baseline:
+
+    python loadtest.py --users 20 --uploads-per-user 3
+    python loadtest.py --baseline loadtest-results/baseline.json
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import signal
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the upload -> process -> download flow")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--uploads-per-user", type=int, default=2)
+    parser.add_argument("--video-seconds", type=float, default=2.0, help="Length of each synthetic video")
+    parser.add_argument("--video-size", default="640x360", help="Resolution of each synthetic video")
+    parser.add_argument("--worker-concurrency", type=int, default=1, help="Celery worker processes")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between status polls")
+    parser.add_argument("--job-timeout", type=float, default=120.0, help="Seconds to wait for a job to finish")
+    parser.add_argument("--port", type=int, default=8765, help="API port")
+    parser.add_argument("--storage-port", type=int, default=8766, help="Static file server port for downloads")
+    parser.add_argument("--worker-metrics-port", type=int, default=8767,
+                        help="First worker metrics port; prefork child N serves port + N")
+    parser.add_argument("--database-url", help="Defaults to a fresh SQLite file")
+    parser.add_argument("--broker-url", help="Celery broker, e.g. redis://localhost:6379; defaults to SQLite")
+    parser.add_argument("--output-dir", default="loadtest-results")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="Allowed %% increase in p95 latency or drop in throughput vs. baseline")
+    return parser.parse_args(argv)
+
+def configure_environment(args: argparse.Namespace, work_dir: str) -> None:
+    """Point the app at local stand-ins; must run before the app is imported.
+
+    The API and worker subprocesses inherit this environment, so every process
+    shares the same database, broker and storage root.
+    """
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(work_dir, 'loadtest.db')}"
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["LOCAL_STORAGE_ROOT"] = os.path.join(work_dir, "storage")
+    os.environ["LOCAL_STORAGE_URL"] = f"http://127.0.0.1:{args.storage_port}"
+    if args.broker_url:
+        os.environ["CELERY_BROKER_URL"] = os.environ["CELERY_RESULT_BACKEND"] = args.broker_url
+    else:
+        os.environ["CELERY_BROKER_URL"] = f"sqla+sqlite:///{os.path.join(work_dir, 'broker.db')}"
+        os.environ["CELERY_RESULT_BACKEND"] = f"db+sqlite:///{os.path.join(work_dir, 'results.db')}"
+    os.environ["WORKER_METRICS_PORT"] = str(args.worker_metrics_port)
+
+@lru_cache(maxsize=None)
+def synthetic_video(seconds: float, size: str) -> bytes:
+    """H.264 test pattern with a static white box standing in for a watermark"""
+    from services.watermark_remover import FFMPEG_BIN
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "synthetic.mp4")
+        subprocess.run(
+            [FFMPEG_BIN, "-v", "error", "-f", "lavfi", "-i", f"testsrc=size={size}:rate=24:duration={seconds}",
+             "-vf", "eq=brightness=-0.5,drawbox=x=iw*0.82:y=ih*0.85:w=iw*0.1:h=ih*0.1:color=white:t=fill",
+             "-c:v", "libx264", "-pix_fmt", "yuv420p", path],
+            check=True,
+        )
+        with open(path, "rb") as f:
+            return f.read()
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    # Nearest rank: the smallest value with at least pct% of samples at or below it
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+class Stats:
+    """Thread-safe latency and error bookkeeping per operation"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.jobs = {"completed": 0, "failed": 0, "timed_out": 0}
+        self.unexpected_errors: Dict[str, int] = {}
+
+    def record(self, op: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.latencies.setdefault(op, []).append(seconds)
+            if not ok:
+                self.errors[op] = self.errors.get(op, 0) + 1
+
+    def job_finished(self, outcome: str) -> None:
+        with self._lock:
+            self.jobs[outcome] += 1
+
+    def unexpected_error(self, error: BaseException) -> None:
+        """A virtual user died on something other than a recorded request failure"""
+        key = f"{type(error).__name__}: {error}"[:200]
+        with self._lock:
+            self.unexpected_errors[key] = self.unexpected_errors.get(key, 0) + 1
+
+    def summary(self) -> Dict[str, dict]:
+        operations = {}
+        for op, values in sorted(self.latencies.items()):
+            errors = self.errors.get(op, 0)
+            operations[op] = {
+                "count": len(values),
+                "errors": errors,
+                "error_rate": errors / len(values),
+                "mean": sum(values) / len(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": max(values),
+            }
+        return operations
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Parse Prometheus text exposition into {sample name with labels: value}"""
+    samples: Dict[str, float] = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            samples[name] = float(value)
+    return samples
+
+def scrape_worker_metrics(first_port: int, concurrency: int) -> List[Dict[str, float]]:
+    """Scrape every prefork child, which is where tasks run and record their metrics"""
+    scraped = []
+    for port in range(first_port + 1, first_port + concurrency + 1):
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            scraped.append(parse_metrics(response.read().decode()))
+    return scraped
+
+def histogram_quantile(samples: List[Dict[str, float]], metric: str, pct: float) -> float:
+    """Upper bound of the bucket holding the pct-th percentile, summed across processes"""
+    prefix = f"{metric}_bucket{{"
+    buckets: Dict[float, float] = {}
+    for process in samples:
+        for name, value in process.items():
+            if name.startswith(prefix):
+                le = name.rsplit('le="', 1)[1].rstrip('"}')
+                bound = float("inf") if le == "+Inf" else float(le)
+                buckets[bound] = buckets.get(bound, 0.0) + value
+    if not buckets.get(float("inf")):
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * buckets[float("inf")]))
+    return next(bound for bound in sorted(buckets) if buckets[bound] >= rank)
+
+def worker_summary(samples: List[Dict[str, float]], concurrency: int, duration: float) -> dict:
+    busy_seconds = sum(
+        value for process in samples for name, value in process.items()
+        if name.startswith("celery_task_duration_seconds_sum")
+    )
+    return {
+        "concurrency": concurrency,
+        "busy_seconds": busy_seconds,
+        "utilization": busy_seconds / (duration * concurrency),
+        # Bucket upper bounds, so coarser than the request percentiles
+        "queue_wait_p50": histogram_quantile(samples, "celery_task_queue_wait_seconds", 50),
+        "queue_wait_p95": histogram_quantile(samples, "celery_task_queue_wait_seconds", 95),
+    }
+
+class Client:
+    """Minimal JSON/multipart HTTP client that records every call"""
+
+    def __init__(self, base_url: str, stats: Stats):
+        self.base_url = base_url
+        self.stats = stats
+        self.token: Optional[str] = None
+
+    def request(self, op: str, method: str, path: str, body: Optional[bytes] = None,
+                content_type: str = "application/json"):
+        headers = {"Content-Type": content_type} if body is not None else {}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        req = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                payload = response.read()
+            self.stats.record(op, time.perf_counter() - start, True)
+            return json.loads(payload) if payload else None
+        except (urllib.error.URLError, OSError) as e:
+            self.stats.record(op, time.perf_counter() - start, False)
+            raise RuntimeError(f"{op} failed: {e}") from e
+
+    def post_json(self, op: str, path: str, data: dict):
+        return self.request(op, "POST", path, json.dumps(data).encode())
+
+    def upload(self, filename: str, content: bytes):
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f"Content-Type: video/mp4\r\n\r\n"
+        ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+        return self.request("upload", "POST", "/api/videos/upload", body,
+                            f"multipart/form-data; boundary={boundary}")
+
+    def fetch(self, url: str) -> bytes:
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=60) as response:
+                content = response.read()
+            self.stats.record("fetch", time.perf_counter() - start, True)
+            return content
+        except (urllib.error.URLError, OSError) as e:
+            self.stats.record("fetch", time.perf_counter() - start, False)
+            raise RuntimeError(f"fetch failed: {e}") from e
+
+def grant_subscription(email: str) -> None:
+    """Uploads require a paid tier; there is no billing flow to drive locally"""
+    from app.database import SessionLocal
+    from app.models import User, SubscriptionTier
+
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.email == email).update({"subscription_tier": SubscriptionTier.MONTHLY})
+        db.commit()
+    finally:
+        db.close()
+
+def run_user(index: int, run_id: str, args: argparse.Namespace, base_url: str, stats: Stats) -> None:
+    client = Client(base_url, stats)
+    email = f"loadtest-{run_id}-{index}@example.com"
+    password = uuid.uuid4().hex
+    try:
+        client.post_json("register", "/api/auth/register", {"email": email, "password": password})
+        grant_subscription(email)
+        client.token = client.post_json("login", "/api/auth/login", {"email": email, "password": password})["access_token"]
+    except RuntimeError:
+        return
+
+    for n in range(args.uploads_per_user):
+        video = synthetic_video(args.video_seconds, args.video_size)
+        job_start = time.perf_counter()
+        try:
+            job_id = client.upload(f"synthetic-{index}-{n}.mp4", video)["job_id"]
+            deadline = time.monotonic() + args.job_timeout
+            while True:
+                job_status = client.request("status", "GET", f"/api/jobs/{job_id}/status")["status"]
+                if job_status in ("completed", "failed"):
+                    break
+                if time.monotonic() > deadline:
+                    stats.job_finished("timed_out")
+                    break
+                time.sleep(args.poll_interval)
+            if job_status != "completed":
+                if job_status == "failed":
+                    stats.job_finished("failed")
+                continue
+
+            download = client.request("download", "GET", f"/api/jobs/{job_id}/download")
+            content = client.fetch(download["download_url"])
+            stats.record("job", time.perf_counter() - job_start, len(content) > 0)
+            stats.job_finished("completed")
+        except RuntimeError:
+            stats.job_finished("failed")
+
+def run_users(args: argparse.Namespace, run_id: str, base_url: str, stats: Stats) -> None:
+    """Run every virtual user concurrently; crashes are counted rather than lost"""
+    with ThreadPoolExecutor(max_workers=args.users) as executor:
+        futures = [
+            executor.submit(run_user, index, run_id, args, base_url, stats)
+            for index in range(args.users)
+        ]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                stats.unexpected_error(e)
+
+def start_process(name: str, command: List[str], ready_urls: List[str], timeout: float = 60.0,
+                  **popen_kwargs) -> subprocess.Popen:
+    """Start a service in its own interpreter and wait until every ready URL answers"""
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)), **popen_kwargs)
+    deadline = time.monotonic() + timeout
+    pending = list(ready_urls)
+    while pending:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} exited with status {process.returncode} during startup")
+        if time.monotonic() > deadline:
+            stop_process(process)
+            raise RuntimeError(f"{name} not ready after {timeout:.0f}s")
+        try:
+            with urllib.request.urlopen(pending[0], timeout=1):
+                pending.pop(0)
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.1)
+    return process
+
+def stop_process(process: subprocess.Popen, timeout: float = 30.0) -> None:
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+def compare_to_baseline(results: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Return human-readable descriptions of capacity regressions"""
+    regressions = []
+    limit = 1 + max_regression / 100.0
+    for op, current in results["operations"].items():
+        previous = baseline.get("operations", {}).get(op)
+        if not previous:
+            continue
+        if previous["p95"] > 0 and current["p95"] > previous["p95"] * limit:
+            regressions.append(f"{op} p95 {previous['p95']:.3f}s -> {current['p95']:.3f}s")
+        if current["error_rate"] > previous["error_rate"] + 0.01:
+            regressions.append(f"{op} error rate {previous['error_rate']:.1%} -> {current['error_rate']:.1%}")
+    previous_throughput = baseline.get("jobs_per_second", 0)
+    if previous_throughput and results["jobs_per_second"] < previous_throughput * (1 - max_regression / 100.0):
+        regressions.append(f"throughput {previous_throughput:.2f} -> {results['jobs_per_second']:.2f} jobs/s")
+    return regressions
+
+def print_report(results: dict) -> None:
+    print(f"\nLoad test {results['run_id']}: {results['config']['users']} users, "
+          f"{results['duration_seconds']:.1f}s")
+    print(f"{'operation':<10} {'count':>6} {'errors':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for op, s in results["operations"].items():
+        print(f"{op:<10} {s['count']:>6} {s['errors']:>6} {s['p50']:>8.3f} {s['p95']:>8.3f} "
+              f"{s['p99']:>8.3f} {s['max']:>8.3f}")
+    jobs = results["jobs"]
+    worker = results["worker"]
+    print(f"jobs: {jobs['completed']} completed, {jobs['failed']} failed, {jobs['timed_out']} timed out "
+          f"({results['jobs_per_second']:.2f} jobs/s, {results['requests_per_second']:.1f} req/s)")
+    print(f"worker: {worker['utilization']:.1%} utilised, queue wait p95 {worker['queue_wait_p95']:.3f}s")
+    for error, count in results["unexpected_errors"].items():
+        print(f"unexpected error x{count}: {error}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    work_dir = tempfile.mkdtemp(prefix="loadtest-")
+    configure_environment(args, work_dir)
+
+    from app.database import engine
+    from app.models import Base
+
+    Base.metadata.create_all(bind=engine)
+    synthetic_video(args.video_seconds, args.video_size)  # encode once, outside the timed run
+    base_url = f"http://127.0.0.1:{args.port}"
+    worker_ports = range(args.worker_metrics_port + 1, args.worker_metrics_port + args.worker_concurrency + 1)
+    stats = Stats()
+    run_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+
+    os.makedirs(os.environ["LOCAL_STORAGE_ROOT"], exist_ok=True)
+    processes = []
+    try:
+        # Downloads go over HTTP like presigned URLs would; its access log goes to /dev/null
+        processes.append(start_process("storage server", [
+            sys.executable, "-m", "http.server", str(args.storage_port),
+            "--bind", "127.0.0.1", "--directory", os.environ["LOCAL_STORAGE_ROOT"],
+        ], [os.environ["LOCAL_STORAGE_URL"]], stderr=subprocess.DEVNULL))
+        processes.append(start_process("API", [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning",
+        ], [f"{base_url}/api/health"]))
+        processes.append(start_process("worker", [
+            sys.executable, "-m", "celery", "-A", "app.celery_app", "worker", "--pool", "prefork",
+            "--concurrency", str(args.worker_concurrency), "--loglevel", "warning",
+        ], [f"http://127.0.0.1:{port}/metrics" for port in worker_ports]))
+
+        started = time.perf_counter()
+        run_users(args, run_id, base_url, stats)
+        duration = time.perf_counter() - started
+        worker = worker_summary(
+            scrape_worker_metrics(args.worker_metrics_port, args.worker_concurrency),
+            args.worker_concurrency, duration,
+        )
+    finally:
+        for process in reversed(processes):
+            stop_process(process)
+
+    operations = stats.summary()
+    results = {
+        "run_id": run_id,
+        "config": vars(args),
+        "duration_seconds": duration,
+        "requests_total": sum(s["count"] for op, s in operations.items() if op not in ("job", "fetch")),
+        "jobs": stats.jobs,
+        "jobs_per_second": stats.jobs["completed"] / duration,
+        "operations": operations,
+        "unexpected_errors": stats.unexpected_errors,
+        "worker": worker,
+    }
+    results["requests_per_second"] = results["requests_total"] / duration
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f"{run_id}.json")
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print_report(results)
+    print(f"results saved to {output_path}")
+
+    # A user that crashed never reached the end of its flow, so the numbers above are incomplete
+    if stats.unexpected_errors:
+        return 1
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.max_regression)
+        if regressions:
+            print("capacity regressions vs. baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,23 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 from typing import List
 import os
 import uuid
+import time
+import asyncio
+import hashlib
+import secrets
 import tempfile
 from datetime import datetime, timedelta
 
-from app.database import get_db, engine, DATABASE_URL
+from app.database import get_db, engine, SessionLocal, DATABASE_URL
 from app.models import Base, User, Job, JobStatus, SubscriptionTier
 from app.schemas import (
     UserCreate, UserLogin, User as UserSchema, Token,
-    JobCreate, Job as JobSchema, JobStatusResponse,
+    JobCreate, Job as JobSchema, JobStatusResponse, BulkJobStatusResponse,
     VideoUploadResponse, VideoDownloadResponse,
     SubscriptionCreate, SubscriptionResponse
 )
@@ -21,6 +26,7 @@ from app.auth import (
     get_current_active_user, verify_token
 )
 from app.tasks import process_video
+from app.metrics import HTTP_REQUEST_SECONDS, CONTENT_TYPE_LATEST, render_latest
 from services.gcs_service import gcs_service
 
 # Create database tables
@@ -38,8 +44,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template rather than raw path to keep cardinality bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status_code),
+        )
+
 security = HTTPBearer()
 
+MAX_BULK_STATUS_JOBS = int(os.getenv("MAX_BULK_STATUS_JOBS", "100"))
+MAX_STATUS_POLL_TIMEOUT_SECONDS = float(os.getenv("MAX_STATUS_POLL_TIMEOUT_SECONDS", "30"))
+MAX_CONCURRENT_LONG_POLLS = int(os.getenv("MAX_CONCURRENT_LONG_POLLS", "100"))
+STATUS_POLL_INTERVAL_SECONDS = 1.0
+# Sent with both 200 and 304 so clients always revalidate
+STATUS_CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+
+# Long polls in flight; only touched from the event loop, so no lock is needed
+_active_long_polls = 0
+
+def _load_job_statuses(user_id: int, job_ids: List[int]) -> list:
+    """Fetch status rows for the user's jobs with a single IN query"""
+    db = SessionLocal()
+    try:
+        return (
+            db.query(Job.id, Job.status, Job.error_message, Job.updated_at)
+            .filter(Job.id.in_(job_ids), Job.user_id == user_id)
+            .order_by(Job.id)
+            .all()
+        )
+    finally:
+        db.close()
+
+def _jobs_etag(jobs: list) -> str:
+    """Weak ETag derived from each job's id, status and updated_at"""
+    digest = hashlib.sha1()
+    for job in sorted(jobs, key=lambda j: j.id):
+        updated_at = job.updated_at.isoformat() if job.updated_at else ""
+        digest.update(f"{job.id}:{job.status.value}:{updated_at};".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
 # User registration
 @app.post("/api/auth/register", response_model=UserSchema)
 def register(user: UserCreate, db: Session = Depends(get_db)):
@@ -88,6 +149,7 @@ def get_me(current_user: User = Depends(get_current_active_user)):
 @app.post("/api/videos/upload", response_model=VideoUploadResponse)
 def upload_video(
     file: UploadFile = File(...),
+    profile: bool = Form(False),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -98,6 +160,13 @@ def upload_video(
             detail="Subscription required for video processing"
         )
     
+    # Profiling slows processing considerably, so only admins may request it
+    if profile and not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Profiling is restricted to administrators"
+        )
+    
     # Validate file type
     if not file.content_type.startswith('video/'):
         raise HTTPException(
@@ -129,7 +198,8 @@ def upload_video(
         user_id=current_user.id,
         original_filename=file.filename,
         original_file_path=gcs_key,
-        status=JobStatus.PENDING
+        status=JobStatus.PENDING,
+        profile_enabled=profile
     )
     db.add(job)
     db.commit()
@@ -166,6 +236,67 @@ def get_job_status(
         error_message=job.error_message
     )
 
+# Get status for many jobs at once
+@app.get("/api/jobs/status", response_model=BulkJobStatusResponse)
+async def get_jobs_status(
+    request: Request,
+    response: Response,
+    ids: List[int] = Query(default=[], description="Job IDs to report on"),
+    timeout: float = Query(0, ge=0, description="Seconds to wait for a change when the ETag still matches"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    global _active_long_polls
+    
+    job_ids = sorted(set(ids))
+    if not job_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one job ID is required"
+        )
+    if len(job_ids) > MAX_BULK_STATUS_JOBS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BULK_STATUS_JOBS} job IDs per request"
+        )
+    
+    # Release the auth session's connection; each check below uses its own session
+    user_id = current_user.id
+    await run_in_threadpool(db.close)
+    
+    if_none_match = request.headers.get("if-none-match")
+    jobs = await run_in_threadpool(_load_job_statuses, user_id, job_ids)
+    etag = _jobs_etag(jobs)
+    
+    # Past the concurrency cap, long polls degrade to a plain conditional request
+    if _etag_matches(if_none_match, etag) and timeout > 0 and _active_long_polls < MAX_CONCURRENT_LONG_POLLS:
+        _active_long_polls += 1
+        try:
+            deadline = time.monotonic() + min(timeout, MAX_STATUS_POLL_TIMEOUT_SECONDS)
+            while _etag_matches(if_none_match, etag):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                await asyncio.sleep(min(STATUS_POLL_INTERVAL_SECONDS, remaining))
+                jobs = await run_in_threadpool(_load_job_statuses, user_id, job_ids)
+                etag = _jobs_etag(jobs)
+        finally:
+            _active_long_polls -= 1
+    
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, **STATUS_CACHE_HEADERS})
+    
+    found_ids = {job.id for job in jobs}
+    response.headers["ETag"] = etag
+    response.headers.update(STATUS_CACHE_HEADERS)
+    return BulkJobStatusResponse(
+        jobs=[
+            JobStatusResponse(job_id=job.id, status=job.status, error_message=job.error_message)
+            for job in jobs
+        ],
+        missing_job_ids=[job_id for job_id in job_ids if job_id not in found_ids]
+    )
+
 # Get user's jobs
 @app.get("/api/jobs", response_model=List[JobSchema])
 def get_user_jobs(
@@ -223,6 +354,20 @@ def download_video(
 def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
+# Prometheus metrics; disabled unless METRICS_TOKEN is set, then scrapers send it as a bearer token
+@app.get("/api/metrics")
+def metrics(request: Request):
+    token = os.getenv("METRICS_TOKEN")
+    if not token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not secrets.compare_digest(request.headers.get("authorization", ""), f"Bearer {token}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
@@ -3,6 +3,7 @@ import logging
 from datetime import datetime, timedelta
 from typing import Optional
 from google.cloud import storage
+from app.metrics import STORAGE_BYTES, time_stage
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +17,9 @@ class GCSService:
         """Upload file to GCS"""
         try:
             blob = self.bucket.blob(gcs_key)
-            blob.upload_from_filename(file_path)
+            with time_stage("upload"):
+                blob.upload_from_filename(file_path)
+            STORAGE_BYTES.inc(os.path.getsize(file_path), direction="upload")
             logger.info(f"File uploaded successfully: {gcs_key}")
             return True
         except Exception as e:
@@ -27,7 +30,9 @@ class GCSService:
         """Download file from GCS"""
         try:
             blob = self.bucket.blob(gcs_key)
-            blob.download_to_filename(local_path)
+            with time_stage("download"):
+                blob.download_to_filename(local_path)
+            STORAGE_BYTES.inc(os.path.getsize(local_path), direction="download")
             logger.info(f"File downloaded successfully: {gcs_key}")
             return True
         except Exception as e:
@@ -63,5 +68,9 @@ class GCSService:
         """Get public URL for file"""
         return f"https://storage.googleapis.com/{self.bucket_name}/{gcs_key}"
 
-# Global instance
-gcs_service = GCSService()
+# Global instance; STORAGE_BACKEND=local swaps in filesystem storage
+if os.getenv('STORAGE_BACKEND', 'gcs') == 'local':
+    from services.local_storage_service import LocalStorageService
+    gcs_service = LocalStorageService()
+else:
+    gcs_service = GCSService()
@@ -0,0 +1,78 @@
+import os
+import shutil
+import logging
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+from app.metrics import STORAGE_BYTES, time_stage
+
+logger = logging.getLogger(__name__)
+
+class LocalStorageService:
+    """Filesystem stand-in for GCSService, used for local runs and load tests"""
+    
+    def __init__(self):
+        self.root = Path(os.getenv('LOCAL_STORAGE_ROOT', 'storage')).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        # When set (e.g. a static file server over the root), URLs are served over HTTP
+        self.base_url = os.getenv('LOCAL_STORAGE_URL', '').rstrip('/')
+    
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Storage key escapes storage root: {key}")
+        return path
+    
+    def upload_file(self, file_path: str, key: str) -> bool:
+        """Copy file into local storage"""
+        try:
+            destination = self._path(key)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            with time_stage("upload"):
+                shutil.copyfile(file_path, destination)
+            STORAGE_BYTES.inc(os.path.getsize(file_path), direction="upload")
+            logger.info(f"File uploaded successfully: {key}")
+            return True
+        except Exception as e:
+            logger.error(f"Error uploading file {key}: {str(e)}")
+            return False
+    
+    def download_file(self, key: str, local_path: str) -> bool:
+        """Copy file out of local storage"""
+        try:
+            with time_stage("download"):
+                shutil.copyfile(self._path(key), local_path)
+            STORAGE_BYTES.inc(os.path.getsize(local_path), direction="download")
+            logger.info(f"File downloaded successfully: {key}")
+            return True
+        except Exception as e:
+            logger.error(f"Error downloading file {key}: {str(e)}")
+            return False
+    
+    def generate_presigned_url(self, key: str, expiration: int = 3600) -> Optional[str]:
+        """Return an HTTP URL under LOCAL_STORAGE_URL, else a file:// URL; local files do not expire"""
+        try:
+            path = self._path(key)
+            if not path.exists():
+                return None
+            return self.get_file_url(key)
+        except Exception as e:
+            logger.error(f"Error generating URL for {key}: {str(e)}")
+            return None
+    
+    def delete_file(self, key: str) -> bool:
+        """Delete file from local storage"""
+        try:
+            self._path(key).unlink()
+            logger.info(f"File deleted successfully: {key}")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting file {key}: {str(e)}")
+            return False
+    
+    def get_file_url(self, key: str) -> str:
+        """Get URL for file"""
+        path = self._path(key)
+        if self.base_url:
+            return f"{self.base_url}/{quote(path.relative_to(self.root).as_posix())}"
+        return path.as_uri()
@@ -1,12 +1,133 @@
 import os
+import json
+import time
 import tempfile
-from typing import List, Tuple, Optional
+import subprocess
+from contextlib import closing
+from typing import Iterable, Iterator, List, NamedTuple, Tuple, Optional
 import logging
 from PIL import Image
 import numpy as np
+from app.metrics import FRAMES_PROCESSED, record_cache, time_stage
 
 logger = logging.getLogger(__name__)
 
+# Mean absolute difference (8-bit levels) under which the masked region counts as unchanged
+INPAINT_REUSE_TOLERANCE = float(os.getenv("INPAINT_REUSE_TOLERANCE", "2.0"))
+# Frames after which the watermark is re-detected even if its region looks unchanged
+MASK_REDETECT_INTERVAL = int(os.getenv("MASK_REDETECT_INTERVAL", "30"))
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
+
+class VideoInfo(NamedTuple):
+    width: int  # as displayed, i.e. after rotation
+    height: int
+    frame_rate: str  # ffmpeg rational, e.g. "30000/1001"
+
+def _stream_rotation(stream: dict) -> int:
+    """Display rotation in degrees from the display matrix side data or the legacy rotate tag"""
+    for side_data in stream.get("side_data_list") or []:
+        if "rotation" in side_data:
+            return int(float(side_data["rotation"]))
+    return int(float((stream.get("tags") or {}).get("rotate", 0)))
+
+def probe_video(path: str) -> VideoInfo:
+    """Read the first video stream's display dimensions and frame rate with ffprobe
+    
+    ffprobe reports coded dimensions, but ffmpeg rotates frames upright on
+    decode, so width and height are swapped for streams rotated by 90 or 270
+    degrees.
+    """
+    result = subprocess.run(
+        [FFPROBE_BIN, "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "stream=width,height,r_frame_rate:stream_tags=rotate:stream_side_data=rotation",
+         "-of", "json", path],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.strip()}")
+    streams = json.loads(result.stdout).get("streams") or []
+    if not streams:
+        raise ValueError(f"No video stream in {path}")
+    stream = streams[0]
+    width, height = int(stream["width"]), int(stream["height"])
+    if _stream_rotation(stream) % 180:
+        width, height = height, width
+    return VideoInfo(width, height, stream["r_frame_rate"])
+
+def _check_ffmpeg(process: subprocess.Popen, stderr, action: str):
+    if process.wait() != 0:
+        stderr.seek(0)
+        raise RuntimeError(f"ffmpeg {action} failed: {stderr.read().decode(errors='replace').strip()}")
+
+def read_frames(path: str, info: VideoInfo) -> Iterator[np.ndarray]:
+    """Decode a video into upright RGB frames"""
+    frame_size = info.width * info.height * 3
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            [FFMPEG_BIN, "-v", "error", "-i", path, "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+            stdout=subprocess.PIPE, stderr=stderr,
+        )
+        finished = False
+        try:
+            while True:
+                with time_stage("decode"):
+                    buffer = process.stdout.read(frame_size)
+                if len(buffer) < frame_size:
+                    finished = True
+                    break
+                yield np.frombuffer(buffer, dtype=np.uint8).reshape(info.height, info.width, 3)
+        finally:
+            process.stdout.close()
+            if finished:
+                _check_ffmpeg(process, stderr, "decode")
+            else:
+                process.kill()
+                process.wait()
+
+def write_frames(frames: Iterable[np.ndarray], output_path: str, info: VideoInfo,
+                 audio_source: Optional[str] = None) -> int:
+    """Encode RGB frames to an H.264 MP4, with audio_source's audio (if any) as AAC
+    
+    The container is always MP4 whatever output_path's extension; audio is
+    transcoded because source codecs (Opus, PCM, ...) may not fit in it.
+    """
+    command = [
+        FFMPEG_BIN, "-v", "error", "-y",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{info.width}x{info.height}",
+        "-r", info.frame_rate, "-i", "-",
+    ]
+    if audio_source:
+        command += ["-i", audio_source, "-map", "0:v:0", "-map", "1:a:0?", "-c:a", "aac", "-b:a", "128k"]
+    command += [
+        # yuv420p needs even dimensions
+        "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2",
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+        "-movflags", "+faststart", "-f", "mp4", output_path,
+    ]
+    count = 0
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=stderr)
+        try:
+            for frame in frames:
+                with time_stage("encode"):
+                    process.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+                count += 1
+        except BrokenPipeError:
+            pass  # encoder exited early; its error is reported below
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+        _check_ffmpeg(process, stderr, "encode")
+    return count
+
 class WatermarkDetector:
     """Simple watermark detector for common patterns"""
     
@@ -15,6 +136,10 @@ class WatermarkDetector:
         
     def detect_watermark(self, frame: np.ndarray) -> np.ndarray:
         """Detect watermark regions in a frame using simple heuristics"""
+        with time_stage("detect"):
+            return self._detect_watermark(frame)
+    
+    def _detect_watermark(self, frame: np.ndarray) -> np.ndarray:
         # Convert to grayscale for analysis
         if len(frame.shape) == 3:
             gray = np.mean(frame, axis=2).astype(np.uint8)
@@ -52,6 +177,10 @@ class WatermarkInpainter:
     
     def inpaint_frame(self, frame: np.ndarray, mask: np.ndarray) -> np.ndarray:
         """Inpaint watermark regions using simple interpolation"""
+        with time_stage("inpaint"):
+            return self._inpaint_frame(frame, mask)
+    
+    def _inpaint_frame(self, frame: np.ndarray, mask: np.ndarray) -> np.ndarray:
         if len(frame.shape) == 3:
             result = frame.copy()
             for c in range(frame.shape[2]):
@@ -78,24 +207,138 @@ class WatermarkInpainter:
         result = image * (1 - mask_norm) + inpainted * mask_norm
         return result.astype(np.uint8)
 
+class InpaintPatchCache:
+    """Reuses the last inpainted patch while the masked region stays unchanged
+    
+    Each frame's region of interest (the mask's bounding box) is reduced to a
+    downsampled signature. If its mean absolute difference from the signature
+    of the frame the cached patch came from is within tolerance, the cached
+    patch is pasted back instead of inpainting again. Comparing against the
+    patch's source frame rather than the previous frame keeps slow drift from
+    accumulating. A negative tolerance disables reuse.
+    """
+    
+    def __init__(self, tolerance: float = INPAINT_REUSE_TOLERANCE, downsample: int = 4):
+        self.tolerance = tolerance
+        self.downsample = downsample
+        self.frames_skipped = 0
+        self.frames_inpainted = 0
+        self._roi: Optional[Tuple[slice, slice]] = None
+        self._mask_roi: Optional[np.ndarray] = None
+        self._signature: Optional[np.ndarray] = None
+        self._patch: Optional[np.ndarray] = None
+    
+    def set_mask(self, mask: np.ndarray):
+        """Set the mask; the cached patch is dropped when the region changes"""
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        self._signature = None
+        self._patch = None
+        if rows.size == 0:
+            self._roi = None
+            self._mask_roi = None
+            return
+        self._roi = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+        self._mask_roi = mask[self._roi] > 0
+        if self._mask_roi.ndim == 2:
+            self._mask_roi = self._mask_roi[..., np.newaxis]
+    
+    def _frame_signature(self, frame: np.ndarray) -> np.ndarray:
+        step = self.downsample
+        return frame[self._roi][::step, ::step].astype(np.int16)
+    
+    def _signature_matches(self, signature: np.ndarray) -> bool:
+        return (self._patch is not None and self.tolerance >= 0
+                and np.mean(np.abs(signature - self._signature)) <= self.tolerance)
+    
+    @property
+    def has_region(self) -> bool:
+        return self._roi is not None
+    
+    def matches(self, frame: np.ndarray) -> bool:
+        """Whether the frame's region is within tolerance of the cached patch's source frame"""
+        return self.has_region and self._signature_matches(self._frame_signature(frame))
+    
+    def inpaint(self, frame: np.ndarray, mask: np.ndarray, inpainter: "WatermarkInpainter") -> np.ndarray:
+        if self._roi is None:
+            return frame
+        
+        signature = self._frame_signature(frame)
+        if self._signature_matches(signature):
+            self.frames_skipped += 1
+            record_cache("inpaint_patch", True)
+            result = frame.copy()
+            frame_roi = frame[self._roi]
+            mask_roi = self._mask_roi if frame_roi.ndim == 3 else self._mask_roi[..., 0]
+            result[self._roi] = np.where(mask_roi, self._patch, frame_roi)
+            return result
+        
+        self.frames_inpainted += 1
+        record_cache("inpaint_patch", False)
+        result = inpainter.inpaint_frame(frame, mask)
+        self._signature = signature
+        self._patch = result[self._roi].copy()
+        return result
+
 class WatermarkRemover:
     """Main class for removing watermarks from videos"""
     
-    def __init__(self):
+    def __init__(self, reuse_tolerance: float = INPAINT_REUSE_TOLERANCE,
+                 redetect_interval: int = MASK_REDETECT_INTERVAL):
         self.detector = WatermarkDetector()
         self.inpainter = WatermarkInpainter()
+        self.reuse_tolerance = reuse_tolerance
+        self.redetect_interval = redetect_interval
+    
+    def remove_watermark_from_frames(self, frames: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        """Remove watermarks from a frame sequence
+        
+        The mask is re-detected whenever the masked region no longer matches
+        the cached patch's source frame (e.g. the watermark moved) and at least
+        every redetect_interval frames; otherwise it is reused. Inpainting is
+        skipped for frames whose region matches (see InpaintPatchCache). A
+        detection that finds nothing keeps the previous mask, so a briefly
+        occluded watermark is still removed once it reappears.
+        """
+        patch_cache = InpaintPatchCache(self.reuse_tolerance)
+        mask = None
+        frames_since_detection = 0
+        for frame in frames:
+            if (mask is None or frames_since_detection >= self.redetect_interval
+                    or (patch_cache.has_region and not patch_cache.matches(frame))):
+                detected = self.detector.detect_watermark(frame)
+                if mask is None or (detected.any() and not np.array_equal(detected, mask)):
+                    mask = detected
+                    patch_cache.set_mask(mask)
+                frames_since_detection = 0
+                record_cache("mask", False)
+            else:
+                record_cache("mask", True)
+            frames_since_detection += 1
+            yield patch_cache.inpaint(frame, mask, self.inpainter)
+            FRAMES_PROCESSED.inc()
         
+        total = patch_cache.frames_inpainted + patch_cache.frames_skipped
+        if total:
+            logger.info(f"Inpainted {patch_cache.frames_inpainted} of {total} frames, "
+                        f"reused patch for {patch_cache.frames_skipped}")
+    
     def remove_watermark_from_video(self, input_path: str, output_path: str) -> bool:
         """Remove watermarks from a video file"""
         try:
             logger.info(f"Processing video: {input_path}")
             
-            # For now, just copy the file as a placeholder
-            # In a real implementation, you would process the video frames
-            import shutil
-            shutil.copy2(input_path, output_path)
+            info = probe_video(input_path)
+            started = time.perf_counter()
+            with closing(read_frames(input_path, info)) as frames:
+                count = write_frames(self.remove_watermark_from_frames(frames), output_path, info,
+                                     audio_source=input_path)
+            if count == 0:
+                raise ValueError("Video has no decodable frames")
+            elapsed = time.perf_counter() - started
             
-            logger.info(f"Video processed successfully: {output_path}")
+            logger.info(f"Video processed successfully: {output_path} "
+                        f"({count} frames, {count / elapsed:.1f} frames/sec)")
             return True
             
         except Exception as e:
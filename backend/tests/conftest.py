@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+import pytest
+
+# Point the app at local stand-ins before anything imports it
+_work_dir = tempfile.mkdtemp(prefix="sora-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_work_dir, 'test.db')}"
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["LOCAL_STORAGE_ROOT"] = os.path.join(_work_dir, "storage")
+
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token
+from app.database import SessionLocal, engine
+from app.models import Base, Job, JobStatus, SubscriptionTier, User
+from main import app
+
+@pytest.fixture(autouse=True)
+def database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def make_user(db):
+    def _make_user(email="user@example.com", **fields):
+        user = User(email=email, hashed_password="unused", subscription_tier=SubscriptionTier.MONTHLY, **fields)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+    return _make_user
+
+@pytest.fixture
+def make_job(db):
+    def _make_job(user, status=JobStatus.PENDING, **fields):
+        job = Job(
+            user_id=user.id,
+            original_filename="clip.mp4",
+            original_file_path=f"uploads/{user.id}/clip.mp4",
+            status=status,
+            **fields
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+    return _make_job
+
+def auth_headers(user):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': str(user.id)})}"}
@@ -0,0 +1,106 @@
+import threading
+import time
+
+import main
+from app.models import Job, JobStatus
+from conftest import auth_headers
+
+def test_bulk_status_returns_etag_and_missing_ids(client, make_user, make_job):
+    user = make_user()
+    first, second = make_job(user), make_job(user, status=JobStatus.COMPLETED)
+
+    response = client.get(
+        "/api/jobs/status",
+        params={"ids": [second.id, first.id, 999]},
+        headers=auth_headers(user),
+    )
+
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('W/"')
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    body = response.json()
+    assert [job["job_id"] for job in body["jobs"]] == [first.id, second.id]
+    assert [job["status"] for job in body["jobs"]] == ["pending", "completed"]
+    assert body["missing_job_ids"] == [999]
+
+def test_bulk_status_not_modified_for_weak_and_bare_etag(client, make_user, make_job):
+    user = make_user()
+    job = make_job(user)
+    headers = auth_headers(user)
+    etag = client.get("/api/jobs/status", params={"ids": [job.id]}, headers=headers).headers["ETag"]
+
+    for tag in (etag, etag[2:], f'"other", {etag}'):
+        response = client.get(
+            "/api/jobs/status",
+            params={"ids": [job.id]},
+            headers={**headers, "If-None-Match": tag},
+        )
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.headers["Cache-Control"] == "private, no-cache"
+
+def test_bulk_status_reports_other_users_jobs_as_missing(client, make_user, make_job):
+    owner = make_user("owner@example.com")
+    other = make_user("other@example.com")
+    job = make_job(owner)
+
+    response = client.get("/api/jobs/status", params={"ids": [job.id]}, headers=auth_headers(other))
+
+    assert response.status_code == 200
+    assert response.json() == {"jobs": [], "missing_job_ids": [job.id]}
+
+def test_bulk_status_requires_ids(client, make_user):
+    response = client.get("/api/jobs/status", headers=auth_headers(make_user()))
+
+    assert response.status_code == 400
+
+def test_bulk_status_rejects_too_many_ids(client, make_user, monkeypatch):
+    monkeypatch.setattr(main, "MAX_BULK_STATUS_JOBS", 2)
+
+    response = client.get("/api/jobs/status", params={"ids": [1, 2, 3]}, headers=auth_headers(make_user()))
+
+    assert response.status_code == 400
+
+def test_long_poll_returns_early_on_change(client, db, make_user, make_job, monkeypatch):
+    monkeypatch.setattr(main, "STATUS_POLL_INTERVAL_SECONDS", 0.1)
+    user = make_user()
+    job = make_job(user)
+    headers = auth_headers(user)
+    etag = client.get("/api/jobs/status", params={"ids": [job.id]}, headers=headers).headers["ETag"]
+
+    def complete_job():
+        time.sleep(0.5)
+        db.query(Job).filter(Job.id == job.id).update({"status": JobStatus.COMPLETED})
+        db.commit()
+
+    updater = threading.Thread(target=complete_job)
+    updater.start()
+    started = time.monotonic()
+    response = client.get(
+        "/api/jobs/status",
+        params={"ids": [job.id], "timeout": 10},
+        headers={**headers, "If-None-Match": etag},
+    )
+    updater.join()
+
+    assert response.status_code == 200
+    assert time.monotonic() - started < 5
+    assert response.json()["jobs"][0]["status"] == "completed"
+    assert response.headers["ETag"] != etag
+
+def test_long_poll_falls_back_to_304_past_concurrency_cap(client, make_user, make_job, monkeypatch):
+    monkeypatch.setattr(main, "MAX_CONCURRENT_LONG_POLLS", 0)
+    user = make_user()
+    job = make_job(user)
+    headers = auth_headers(user)
+    etag = client.get("/api/jobs/status", params={"ids": [job.id]}, headers=headers).headers["ETag"]
+
+    started = time.monotonic()
+    response = client.get(
+        "/api/jobs/status",
+        params={"ids": [job.id], "timeout": 10},
+        headers={**headers, "If-None-Match": etag},
+    )
+
+    assert response.status_code == 304
+    assert time.monotonic() - started < 5
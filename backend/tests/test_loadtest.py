@@ -0,0 +1,59 @@
+import argparse
+
+import pytest
+
+import loadtest
+
+@pytest.mark.parametrize("pct, expected", [(50, 5), (90, 9), (95, 10), (99, 10), (100, 10), (1, 1), (0, 1)])
+def test_percentile_uses_nearest_rank(pct, expected):
+    assert loadtest.percentile(list(range(10, 0, -1)), pct) == expected
+
+def test_percentile_of_no_samples_is_zero():
+    assert loadtest.percentile([], 95) == 0.0
+
+def test_crashed_users_are_counted_as_unexpected_errors(monkeypatch):
+    def run_user(index, *args):
+        if index % 2:
+            raise KeyError("job_id")
+
+    monkeypatch.setattr(loadtest, "run_user", run_user)
+    stats = loadtest.Stats()
+
+    loadtest.run_users(argparse.Namespace(users=4), "run", "http://unused", stats)
+
+    assert stats.unexpected_errors == {"KeyError: 'job_id'": 2}
+
+def test_compare_to_baseline_flags_p95_and_throughput_regressions():
+    baseline = {"operations": {"upload": {"p95": 1.0, "error_rate": 0.0}}, "jobs_per_second": 2.0}
+    results = {"operations": {"upload": {"p95": 1.5, "error_rate": 0.0}}, "jobs_per_second": 1.0}
+
+    regressions = loadtest.compare_to_baseline(results, baseline, max_regression=20.0)
+
+    assert len(regressions) == 2
+    assert loadtest.compare_to_baseline(baseline, baseline, 20.0) == []
+
+    # A 20% budget allows throughput down to exactly 80% of the baseline, not below
+    at_limit = {"operations": {}, "jobs_per_second": 1.6}
+    past_limit = {"operations": {}, "jobs_per_second": 1.59}
+    assert loadtest.compare_to_baseline(at_limit, baseline, 20.0) == []
+    assert loadtest.compare_to_baseline(past_limit, baseline, 20.0) == ["throughput 2.00 -> 1.59 jobs/s"]
+
+def test_worker_summary_combines_prefork_children():
+    def child(busy, waits):
+        lines = [f"celery_task_duration_seconds_sum{{task=\"t\",state=\"SUCCESS\"}} {busy}"]
+        for bound, count in waits:
+            lines.append(f"celery_task_queue_wait_seconds_bucket{{task=\"t\",le=\"{bound}\"}} {count}")
+        return loadtest.parse_metrics("\n".join(lines))
+
+    samples = [
+        child(3.0, [("0.1", 1.0), ("1.0", 2.0), ("+Inf", 2.0)]),
+        child(1.0, [("0.1", 0.0), ("1.0", 1.0), ("+Inf", 2.0)]),
+    ]
+
+    worker = loadtest.worker_summary(samples, concurrency=2, duration=4.0)
+
+    assert worker["busy_seconds"] == 4.0
+    assert worker["utilization"] == 0.5
+    assert worker["queue_wait_p50"] == 1.0
+    assert worker["queue_wait_p95"] == float("inf")
+    assert loadtest.worker_summary([{}], 1, 1.0)["queue_wait_p95"] == 0.0
@@ -0,0 +1,18 @@
+from services.local_storage_service import LocalStorageService
+
+def test_urls_use_file_scheme_without_base_url(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCAL_STORAGE_ROOT", str(tmp_path))
+    monkeypatch.delenv("LOCAL_STORAGE_URL", raising=False)
+    (tmp_path / "video.mp4").write_bytes(b"data")
+
+    assert LocalStorageService().generate_presigned_url("video.mp4") == (tmp_path / "video.mp4").as_uri()
+
+def test_urls_are_served_over_http_with_base_url(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCAL_STORAGE_ROOT", str(tmp_path))
+    monkeypatch.setenv("LOCAL_STORAGE_URL", "http://127.0.0.1:8766/")
+    (tmp_path / "videos" / "1").mkdir(parents=True)
+    (tmp_path / "videos" / "1" / "my clip.mp4").write_bytes(b"data")
+    storage = LocalStorageService()
+
+    assert storage.generate_presigned_url("videos/1/my clip.mp4") == "http://127.0.0.1:8766/videos/1/my%20clip.mp4"
+    assert storage.generate_presigned_url("videos/1/missing.mp4") is None
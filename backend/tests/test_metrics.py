@@ -0,0 +1,59 @@
+import pytest
+
+from app.metrics import Counter, Histogram, Registry
+
+def test_histogram_renders_cumulative_buckets_and_inf():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value, route="/a")
+
+    lines = histogram.render()
+
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 2.0' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3.0' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4.0' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.65' in lines
+    assert 'latency_seconds_count{route="/a"} 4.0' in lines
+    assert lines[:2] == ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"]
+
+def test_label_values_are_escaped():
+    counter = Counter("events_total", "Events", ("name",))
+    counter.inc(name='a"b\\c\nd')
+
+    assert counter.render()[-1] == 'events_total{name="a\\"b\\\\c\\nd"} 1.0'
+
+def test_unlabelled_counter_renders_without_braces():
+    counter = Counter("frames_total", "Frames")
+    counter.inc(3)
+
+    assert counter.render()[-1] == "frames_total 3.0"
+
+@pytest.mark.parametrize("labels", [{}, {"route": "/a", "extra": "x"}, {"other": "/a"}])
+def test_label_mismatch_raises(labels):
+    histogram = Histogram("latency_seconds", "Latency", ("route",))
+
+    with pytest.raises(ValueError):
+        histogram.observe(1.0, **labels)
+
+def test_registry_rejects_duplicate_names():
+    registry = Registry()
+    registry.counter("events_total", "Events")
+
+    with pytest.raises(ValueError):
+        registry.counter("events_total", "Events")
+
+def test_metrics_endpoint_disabled_without_token(client, monkeypatch):
+    monkeypatch.delenv("METRICS_TOKEN", raising=False)
+
+    assert client.get("/api/metrics").status_code == 404
+
+def test_metrics_endpoint_requires_token(client, monkeypatch):
+    monkeypatch.setenv("METRICS_TOKEN", "scrape-secret")
+
+    assert client.get("/api/metrics").status_code == 401
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.get("/api/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
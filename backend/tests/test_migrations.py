@@ -0,0 +1,50 @@
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+
+from app.database import engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini")
+
+def _columns(table):
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+def _alembic_config():
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "alembic"))
+    return config
+
+def test_upgrade_adds_profiling_columns_to_legacy_tables():
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE jobs"))
+        connection.execute(text("DROP TABLE users"))
+        connection.execute(text(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR NOT NULL, "
+            "hashed_password VARCHAR NOT NULL, is_active BOOLEAN)"
+        ))
+        connection.execute(text(
+            "CREATE TABLE jobs (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+            "original_filename VARCHAR NOT NULL, original_file_path VARCHAR NOT NULL)"
+        ))
+        connection.execute(text("INSERT INTO users (id, email, hashed_password, is_active) VALUES (1, 'a@example.com', 'x', 1)"))
+
+    try:
+        command.upgrade(_alembic_config(), "head")
+
+        assert "is_admin" in _columns("users")
+        assert {"profile_enabled", "profile_path", "memory_snapshot_path", "profile_summary"} <= _columns("jobs")
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT is_admin FROM users WHERE id = 1")).scalar() == 0
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+
+def test_upgrade_is_a_no_op_on_up_to_date_schema():
+    try:
+        command.upgrade(_alembic_config(), "head")
+        assert "is_admin" in _columns("users")
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
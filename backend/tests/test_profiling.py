@@ -0,0 +1,77 @@
+import threading
+
+from app.metrics import time_stage
+from app.profiling import JobProfiler
+
+def test_nested_stages_keep_outer_peak():
+    profiler = JobProfiler()
+    with profiler:
+        with time_stage("process"):
+            with time_stage("inpaint"):
+                scratch = bytearray(4_000_000)
+                del scratch
+            kept = bytearray(1_000_000)
+    del kept
+
+    process, inpaint = profiler.stages["process"], profiler.stages["inpaint"]
+    assert inpaint["max_peak_bytes"] >= 3_900_000
+    assert process["max_peak_bytes"] >= 3_900_000
+    assert process["net_bytes"] >= 900_000
+    assert profiler.peak_memory_bytes >= 3_900_000
+
+def test_stages_in_other_threads_are_not_recorded():
+    profiler = JobProfiler()
+
+    def unrelated_job():
+        with time_stage("detect"):
+            bytearray(1000)
+
+    with profiler:
+        worker = threading.Thread(target=unrelated_job)
+        worker.start()
+        worker.join()
+        with time_stage("upload"):
+            pass
+
+    assert set(profiler.stages) == {"upload"}
+
+def test_concurrent_profilers_do_not_reset_each_others_peaks():
+    inner_started, outer_done = threading.Event(), threading.Event()
+    results = {}
+
+    def other_job():
+        other = JobProfiler()
+        with other:
+            with time_stage("detect"):
+                inner_started.set()
+                outer_done.wait(5)
+        results["other"] = other
+
+    profiler = JobProfiler()
+    thread = threading.Thread(target=other_job)
+    with profiler:
+        with time_stage("inpaint"):
+            thread.start()
+            inner_started.wait(5)
+            scratch = bytearray(3_000_000)
+            del scratch
+            # The other job's stage boundary resets the global peak mid-stage
+            outer_done.set()
+            thread.join()
+
+    assert profiler.stages["inpaint"]["max_peak_bytes"] >= 2_900_000
+    assert set(results["other"].stages) == {"detect"}
+
+def test_summary_lists_hot_functions_and_allocations(tmp_path):
+    profiler = JobProfiler(top_n=5)
+    with profiler:
+        with time_stage("detect"):
+            blocks = [bytearray(1000) for _ in range(500)]
+    del blocks
+
+    summary = profiler.summary()
+    profile_path, snapshot_path = profiler.save(str(tmp_path))
+
+    assert summary["top_functions"] and summary["top_allocations"]
+    assert summary["stages"]["detect"]["calls"] == 1
+    assert (tmp_path / "profile.prof").exists() and (tmp_path / "memory.snapshot").exists()
@@ -0,0 +1,183 @@
+import re
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from app import metrics
+from services import watermark_remover as wr
+from services.watermark_remover import InpaintPatchCache, WatermarkRemover
+
+def _clip(frame_count=12, drift=0, seed=0):
+    """Frames with a bright static watermark bottom-right and motion at the top"""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 120, (360, 640, 3), dtype=np.uint8)
+    base[300:340, 540:600] = 255
+    frames = []
+    for i in range(frame_count):
+        frame = base.copy()
+        frame[:200] = rng.integers(0, 120, (200, 640, 3), dtype=np.uint8)
+        if drift:
+            frame[270:] = np.clip(frame[270:].astype(int) + drift * i, 0, 255)
+        frames.append(frame)
+    return frames
+
+def _full_inpaint(frames):
+    return list(WatermarkRemover(reuse_tolerance=-1).remove_watermark_from_frames(frames))
+
+def test_static_region_reuses_patch_with_identical_output():
+    frames = _clip()
+    remover = WatermarkRemover(reuse_tolerance=2.0)
+
+    output = list(remover.remove_watermark_from_frames(frames))
+
+    for reused, full in zip(output, _full_inpaint(frames)):
+        np.testing.assert_array_equal(reused, full)
+
+def test_patch_cache_counts_skipped_frames():
+    frames = _clip(frame_count=10)
+    cache = InpaintPatchCache(tolerance=2.0)
+    remover = WatermarkRemover()
+    mask = remover.detector.detect_watermark(frames[0])
+    cache.set_mask(mask)
+
+    for frame in frames:
+        cache.inpaint(frame, mask, remover.inpainter)
+
+    assert (cache.frames_inpainted, cache.frames_skipped) == (1, 9)
+
+def test_slow_drift_is_bounded_by_tolerance():
+    # Each frame brightens the region by one level; comparing against the patch's
+    # source frame (not the previous frame) forces periodic re-inpainting
+    frames = _clip(frame_count=12, drift=1)
+    cache = InpaintPatchCache(tolerance=2.0)
+    remover = WatermarkRemover()
+    mask = remover.detector.detect_watermark(frames[0])
+    cache.set_mask(mask)
+
+    output = [cache.inpaint(frame, mask, remover.inpainter) for frame in frames]
+
+    assert cache.frames_inpainted == 4
+    assert cache.frames_skipped == 8
+    for reused, full in zip(output, _full_inpaint(frames)):
+        assert np.abs(reused.astype(int) - full.astype(int)).max() <= 2
+
+def test_content_change_in_region_forces_inpaint():
+    frames = _clip(frame_count=6)
+    frames[3] = frames[3].copy()
+    frames[3][280:360, 490:640] = 0
+    remover = WatermarkRemover(reuse_tolerance=2.0)
+
+    output = list(remover.remove_watermark_from_frames(frames))
+
+    np.testing.assert_array_equal(output[3], _full_inpaint(frames)[3])
+
+def test_negative_tolerance_disables_reuse():
+    frames = _clip(frame_count=4)
+    cache = InpaintPatchCache(tolerance=-1)
+    remover = WatermarkRemover()
+    mask = remover.detector.detect_watermark(frames[0])
+    cache.set_mask(mask)
+
+    for frame in frames:
+        cache.inpaint(frame, mask, remover.inpainter)
+
+    assert (cache.frames_inpainted, cache.frames_skipped) == (4, 0)
+
+def test_moving_watermark_is_redetected():
+    frames = _clip(frame_count=12)
+    for frame in frames[6:]:
+        frame[300:340, 540:600] = frames[0][300:340, 480:540]
+        frame[300:340, 40:100] = 255
+
+    output = list(WatermarkRemover(reuse_tolerance=2.0).remove_watermark_from_frames(frames))
+
+    for frame, out in zip(frames[6:], output[6:]):
+        assert not np.array_equal(out[300:340, 40:100], frame[300:340, 40:100])
+    for reused, full in zip(output, _full_inpaint(frames)):
+        np.testing.assert_array_equal(reused, full)
+
+def test_mask_cache_hits_count_skipped_detections():
+    def mask_requests():
+        return tuple(metrics.CACHE_REQUESTS.value(cache="mask", result=r) for r in ("hit", "miss"))
+
+    before = mask_requests()
+    list(WatermarkRemover(reuse_tolerance=2.0, redetect_interval=5).remove_watermark_from_frames(_clip(12)))
+    hits, misses = (after - start for after, start in zip(mask_requests(), before))
+
+    # Static region: detected on frames 0, 5 and 10 only
+    assert (hits, misses) == (9, 3)
+
+def test_frames_without_watermark_pass_through():
+    frame = np.full((120, 160, 3), 40, dtype=np.uint8)
+
+    output = list(WatermarkRemover().remove_watermark_from_frames([frame, frame]))
+
+    assert all(out is frame for out in output)
+
+requires_ffmpeg = pytest.mark.skipif(
+    not (shutil.which(wr.FFMPEG_BIN) and shutil.which(wr.FFPROBE_BIN)),
+    reason="ffmpeg and ffprobe are required",
+)
+
+@requires_ffmpeg
+def test_remove_watermark_from_video_round_trip(tmp_path):
+    source, output = tmp_path / "in.mp4", tmp_path / "out.mp4"
+    subprocess.run(
+        [wr.FFMPEG_BIN, "-v", "error", "-f", "lavfi", "-i", "testsrc=size=320x240:rate=24:duration=1",
+         "-vf", "drawbox=x=260:y=200:w=30:h=20:color=white:t=fill", "-pix_fmt", "yuv420p", str(source)],
+        check=True,
+    )
+
+    assert WatermarkRemover().remove_watermark_from_video(str(source), str(output))
+    assert wr.probe_video(str(output))[:2] == (320, 240)
+    assert sum(1 for _ in wr.read_frames(str(output), wr.probe_video(str(output)))) == 24
+
+def _ffmpeg(*args):
+    subprocess.run([wr.FFMPEG_BIN, "-v", "error", "-y", *map(str, args)], check=True)
+
+def _audio_codec(path):
+    probe = subprocess.run([wr.FFMPEG_BIN, "-hide_banner", "-i", str(path)], capture_output=True, text=True)
+    match = re.search(r"Audio: (\w+)", probe.stderr)
+    return match.group(1) if match else None
+
+@requires_ffmpeg
+def test_rotated_video_is_processed_upright(tmp_path):
+    coded, source, output = tmp_path / "coded.mp4", tmp_path / "in.mp4", tmp_path / "out.mp4"
+    _ffmpeg("-f", "lavfi", "-i", "testsrc=size=320x240:rate=24:duration=1",
+            "-vf", "drawbox=x=260:y=200:w=30:h=20:color=white:t=fill", "-pix_fmt", "yuv420p", coded)
+    try:
+        _ffmpeg("-display_rotation", "90", "-i", coded, "-c", "copy", source)
+    except subprocess.CalledProcessError:  # ffmpeg < 7 has no -display_rotation
+        _ffmpeg("-i", coded, "-c", "copy", "-metadata:s:v:0", "rotate=90", source)
+    info = wr.probe_video(str(source))
+    assert info[:2] == (240, 320)
+
+    assert WatermarkRemover().remove_watermark_from_video(str(source), str(output))
+
+    assert wr.probe_video(str(output))[:2] == (240, 320)
+    for before, after in zip(wr.read_frames(str(source), info), wr.read_frames(str(output), info)):
+        assert np.mean(np.abs(before.astype(int) - after.astype(int))) < 10
+
+@requires_ffmpeg
+@pytest.mark.parametrize("suffix, codecs", [
+    (".webm", ["-c:v", "libvpx-vp9", "-deadline", "realtime", "-c:a", "libopus"]),
+    (".mov", ["-c:v", "libx264", "-c:a", "pcm_s16le"]),
+])
+def test_output_is_mp4_with_aac_audio(tmp_path, suffix, codecs):
+    source, output = tmp_path / f"in{suffix}", tmp_path / "out.mp4"
+    _ffmpeg("-f", "lavfi", "-i", "testsrc=size=160x120:rate=12:duration=1",
+            "-f", "lavfi", "-i", "sine=frequency=440:duration=1", "-pix_fmt", "yuv420p", *codecs, source)
+
+    assert WatermarkRemover().remove_watermark_from_video(str(source), str(output))
+
+    assert _audio_codec(output) == "aac"
+    assert wr.probe_video(str(output))[:2] == (160, 120)
+
+@requires_ffmpeg
+def test_remove_watermark_from_video_rejects_non_video(tmp_path):
+    source = tmp_path / "in.mp4"
+    source.write_bytes(b"not a video")
+
+    assert not WatermarkRemover().remove_watermark_from_video(str(source), str(tmp_path / "out.mp4"))
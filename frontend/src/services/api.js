@@ -38,9 +38,12 @@ export const authAPI = {
 };
 
 export const videoAPI = {
-  upload: (file) => {
+  upload: (file, { profile = false } = {}) => {
     const formData = new FormData();
     formData.append('file', file);
+    if (profile) {
+      formData.append('profile', 'true');
+    }
     return api.post('/api/videos/upload', formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
@@ -48,6 +51,15 @@ export const videoAPI = {
     });
   },
   getJobStatus: (jobId) => api.get(`/api/jobs/${jobId}/status`),
+  getJobsStatus: (jobIds, { etag, timeout = 0 } = {}) => {
+    const params = new URLSearchParams();
+    jobIds.forEach((id) => params.append('ids', id));
+    params.append('timeout', timeout);
+    return api.get(`/api/jobs/status?${params.toString()}`, {
+      headers: etag ? { 'If-None-Match': etag } : {},
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+    });
+  },
   getUserJobs: () => api.get('/api/jobs'),
   downloadVideo: (jobId) => api.get(`/api/jobs/${jobId}/download`),
 };